@@ -2,7 +2,12 @@
 # Imports & Config
 # ==========================================================
 import os
+import asyncio
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+import numpy as np
 import pandas as pd
 import yfinance as yf
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
@@ -57,10 +62,12 @@ START_TEXT = """
 🚀 คำสั่งเริ่มต้น
 /ta <symbol>   วิเคราะห์เชิงเทคนิค
 /ai <symbol>   AI Investment Thesis
+/backtest <symbol>   ทดสอบกลยุทธ์ย้อนหลัง
 
 📌 ตัวอย่าง
 /ta aapl
 /ai nvda
+/backtest msft
 
 ℹ️ ดูคำสั่งทั้งหมด
 /help
@@ -84,6 +91,10 @@ HELP_TEXT = """
 • มุมมองเชิงกลยุทธ์แบบนักลงทุนสถาบัน
 • สรุป Risk / Opportunity / Action bias
 
+/backtest <symbol>
+• Backtest กลยุทธ์ rule-based ย้อนหลัง 10 ปี
+• Return, Hit rate, Max Drawdown เทียบ Buy & Hold
+
 ━━━━━━━━━━
 🟡 DETAIL (coming / optional)
 ━━━━━━━━━━
@@ -122,6 +133,7 @@ HELP_TEXT = """
 ━━━━━━━━━━
 /ta msft
 /ai tsla
+/backtest nvda
 
 ⚠️ ข้อมูลเพื่อการศึกษา ไม่ใช่คำแนะนำการลงทุน
 """
@@ -263,22 +275,54 @@ def format_market_comparison(symbol, stock, nasdaq, sp500):
 # ==========================================================
 # Strategic Thesis (Rule-based)
 # ==========================================================
+RSI_OVERBOUGHT = 70
+RSI_OVERSOLD = 30
+RSI_ACCUMULATE = (40, 60)
+
+STRATEGY_TEXT = {
+    "BUY": "  🟢 กลยุทธ์: ทยอยสะสม (Buy on Weakness)",
+    "HOLD": "  🟡 กลยุทธ์: ถือ / รอย่อ",
+    "AVOID": "  🔴 กลยุทธ์: หลีกเลี่ยง / รอฐานใหม่",
+    "WAIT": "  🟡 กลยุทธ์: รอดู Confirmation",
+}
+
+
+def _select(conditions, choices, default, like):
+    # np.select for both scalars (/ta) and Series (backtest)
+    out = np.select(conditions, choices, default=default)
+    if isinstance(like, pd.Series):
+        return pd.Series(out, index=like.index)
+    return str(out)
+
+
+def thesis_rules(price, ema50, ema100, ema200, rsi):
+    # Shared by pro_investor_thesis() and the backtest: returns (trend, strategy)
+    up = np.logical_and.reduce([price > ema50, ema50 > ema100, ema100 > ema200])
+    down = np.logical_and(np.logical_not(up), price < ema200)
+    trend = _select([up, down], ["UP", "DOWN"], "SIDE", price)
+
+    low, high = RSI_ACCUMULATE
+    pullback = np.logical_and.reduce([up, rsi >= low, rsi <= high, price <= ema50])
+    stretched = np.logical_and(up, rsi > RSI_OVERBOUGHT)
+    strategy = _select([pullback, stretched, down], ["BUY", "HOLD", "AVOID"], "WAIT", price)
+
+    return trend, strategy
+
+
 def pro_investor_thesis(price, ema50, ema100, ema200, rsi, slope200, macd, signal, hist):
     thesis = []
+    trend, strategy = thesis_rules(price, ema50, ema100, ema200, rsi)
 
-    if price > ema50 > ema100 > ema200:
+    if trend == "UP":
         thesis.append("  📈 แนวโน้มขาขึ้นแข็งแกร่ง")
-        trend = "UP"
-    elif price < ema200:
+    elif trend == "DOWN":
         thesis.append("  📉 แนวโน้มขาลง")
-        trend = "DOWN"
     else:
         thesis.append("  ⚖️ แนวโน้มแกว่งตัว / สะสมพลัง")
-        trend = "SIDE"
 
-    if rsi > 70:
+    if rsi > RSI_OVERBOUGHT:
         thesis.append("  🔥 โมเมนตัมร้อนแรง แต่เริ่มตึง")
-    elif rsi < 30:
+    elif rsi < RSI_OVERSOLD:
         thesis.append("  ❄️ โมเมนตัมอ่อน รอสัญญาณกลับตัว")
     else:
         thesis.append("  ✅ โมเมนตัมปกติ เหมาะกับการสะสม")
@@ -296,18 +340,196 @@ def pro_investor_thesis(price, ema50, ema100, ema200, rsi, slope200, macd, signa
         else "  📐 EMA200 แบน/ลง ระวังสัญญาณหลอก (False Rally)"
     )
 
-    if trend == "UP" and 40 <= rsi <= 60 and price <= ema50:
-        thesis.append("  🟢 กลยุทธ์: ทยอยสะสม (Buy on Weakness)")
-    elif trend == "UP" and rsi > 70:
-        thesis.append("  🟡 กลยุทธ์: ถือ / รอย่อ")
-    elif trend == "DOWN":
-        thesis.append("  🔴 กลยุทธ์: หลีกเลี่ยง / รอฐานใหม่")
-    else:
-        thesis.append("  🟡 กลยุทธ์: รอดู Confirmation")
+    thesis.append(STRATEGY_TEXT[strategy])
 
     return "\n".join(thesis)
 
 
+# ==========================================================
+# Backtest Engine (Vectorized Thesis)
+# ==========================================================
+BACKTEST_PERIOD = "10y"
+BACKTEST_WARMUP = 200      # bars needed before EMA200 is meaningful
+BACKTEST_HORIZON = 20      # forward bars used to score each strategy label
+BACKTEST_MIN_SCORED = 252  # ~1 year of scored bars before results mean anything
+BACKTEST_MIN_BARS = BACKTEST_WARMUP + BACKTEST_HORIZON + BACKTEST_MIN_SCORED
+BACKTEST_WORKERS = 8
+
+STRATEGY_LABELS = {
+    "BUY": "🟢 Buy on Weakness",
+    "HOLD": "🟡 ถือ / รอย่อ",
+    "AVOID": "🔴 หลีกเลี่ยง",
+    "WAIT": "🟡 รอดู Confirmation",
+}
+
+
+class InsufficientHistoryError(Exception):
+    pass
+
+
+_backtest_cache = {}       # (symbol, date) -> Future, so each symbol is fetched once per day
+_backtest_cache_lock = threading.Lock()
+_backtest_pool = ThreadPoolExecutor(max_workers=BACKTEST_WORKERS)
+
+
+def thesis_signal_series(close):
+    ema50 = close.ewm(span=50, adjust=False).mean()
+    ema100 = close.ewm(span=100, adjust=False).mean()
+    ema200 = close.ewm(span=200, adjust=False).mean()
+    rsi = calculate_rsi(close)
+
+    _, strategy = thesis_rules(close, ema50, ema100, ema200, rsi)
+    return strategy
+
+
+def _position_series(signals):
+    # BUY / HOLD = in market, AVOID = flat, WAIT = keep previous position.
+    # Shift by one bar so a signal only trades on the next bar's return.
+    pos = signals.map({"BUY": 1.0, "HOLD": 1.0, "AVOID": 0.0})
+    return pos.ffill().fillna(0.0).shift(1).fillna(0.0)
+
+
+def _trade_returns(position, bar_returns):
+    in_market = position > 0
+    entries = in_market & ~in_market.shift(1, fill_value=False)
+    trade_id = entries.cumsum()[in_market]
+    if trade_id.empty:
+        return pd.Series(dtype=float)
+    return (1 + bar_returns[in_market]).groupby(trade_id).prod() - 1
+
+
+def _max_drawdown(equity):
+    return (equity / equity.cummax() - 1).min() * 100
+
+
+def _label_stats(signals, close):
+    fwd = (close.shift(-BACKTEST_HORIZON) / close - 1) * 100
+    frame = pd.DataFrame({"label": signals, "fwd": fwd}).dropna()
+    grouped = frame.groupby("label")["fwd"]
+
+    stats = pd.DataFrame({
+        "bars": grouped.size(),
+        "avg_fwd": grouped.mean(),
+        "hit_rate": frame.assign(win=frame.fwd > 0).groupby("label")["win"].mean() * 100,
+    })
+    return stats.reindex(list(STRATEGY_LABELS)).fillna({"bars": 0}).to_dict("index")
+
+
+def run_backtest(close) -> dict:
+    signals = thesis_signal_series(close).iloc[BACKTEST_WARMUP:]
+    close = close.iloc[BACKTEST_WARMUP:]
+
+    bar_returns = close.pct_change().fillna(0.0)
+    position = _position_series(signals)
+    strategy_returns = position * bar_returns
+
+    equity = (1 + strategy_returns).cumprod()
+    buy_hold = (1 + bar_returns).cumprod()
+    trades = _trade_returns(position, bar_returns)
+
+    return {
+        "start": close.index[0],
+        "end": close.index[-1],
+        "bars": len(close),
+        "signals": signals,
+        "labels": _label_stats(signals, close),
+        "trades": trades,
+        "n_trades": len(trades),
+        "hit_rate": (trades > 0).mean() * 100 if len(trades) else None,
+        "avg_trade": trades.mean() * 100 if len(trades) else None,
+        "total_return": (equity.iloc[-1] - 1) * 100,
+        "buy_hold_return": (buy_hold.iloc[-1] - 1) * 100,
+        "max_drawdown": _max_drawdown(equity),
+        "buy_hold_drawdown": _max_drawdown(buy_hold),
+        "exposure": position.mean() * 100,
+    }
+
+
+def _fetch_and_backtest(symbol):
+    data = yf.Ticker(symbol).history(period=BACKTEST_PERIOD)
+
+    if data.empty:
+        raise ValueError("SYMBOL_NOT_FOUND")
+    if len(data) < BACKTEST_MIN_BARS:
+        raise InsufficientHistoryError(symbol)
+
+    return run_backtest(data["Close"])
+
+
+def _evict_failed(key, future):
+    # don't cache errors for the whole day; next request retries
+    if future.cancelled() or future.exception() is not None:
+        with _backtest_cache_lock:
+            if _backtest_cache.get(key) is future:
+                del _backtest_cache[key]
+
+
+def submit_backtest(symbol: str):
+    key = (symbol.upper(), date.today())
+
+    with _backtest_cache_lock:
+        future = _backtest_cache.get(key)
+        if future is not None:
+            return future
+
+        # keep only today's entries
+        for stale in [k for k in _backtest_cache if k[1] != key[1]]:
+            del _backtest_cache[stale]
+
+        future = _backtest_pool.submit(_fetch_and_backtest, key[0])
+        _backtest_cache[key] = future
+
+    future.add_done_callback(lambda f: _evict_failed(key, f))
+    return future
+
+
+def backtest(symbol: str) -> dict:
+    return submit_backtest(symbol).result()
+
+
+def backtest_universe(symbols) -> dict:
+    futures = {submit_backtest(s): s.upper() for s in dict.fromkeys(symbols)}
+    results = {}
+
+    for future in as_completed(futures):
+        symbol = futures[future]
+        try:
+            results[symbol] = future.result()
+        except Exception as e:
+            logging.warning("Backtest skipped: %s (%r)", symbol, e)
+
+    return results
+
+
+def format_backtest(symbol, bt):
+    def pct(v):
+        return "-" if v is None or pd.isna(v) else f"{v:+.2f}%"
+
+    lines = [
+        f"🧪 Backtest {symbol}",
+        f"📅 {bt['start']:%Y-%m-%d} → {bt['end']:%Y-%m-%d} ({bt['bars']} bars)",
+        "",
+        "📈 Thesis Strategy (Long on Buy/Hold, Flat on Avoid)",
+        f"• Return: {pct(bt['total_return'])} | Buy & Hold: {pct(bt['buy_hold_return'])}",
+        f"• Max Drawdown: {pct(bt['max_drawdown'])} | Buy & Hold: {pct(bt['buy_hold_drawdown'])}",
+        f"• Trades: {bt['n_trades']} | Hit rate: "
+        + ("-" if bt["hit_rate"] is None else f"{bt['hit_rate']:.1f}%"),
+        f"• Avg trade: {pct(bt['avg_trade'])} | Exposure: {bt['exposure']:.1f}%",
+        "",
+        f"🧠 ผลตามกลยุทธ์ (ผลตอบแทน {BACKTEST_HORIZON} วันถัดไป)",
+    ]
+
+    for key, name in STRATEGY_LABELS.items():
+        s = bt["labels"][key]
+        if not s["bars"]:
+            lines.append(f"• {name}: ไม่มีสัญญาณ")
+            continue
+        hit = "-" if pd.isna(s["hit_rate"]) else f"{s['hit_rate']:.1f}%"
+        lines.append(f"• {name}: {int(s['bars'])} bars | Avg {pct(s['avg_fwd'])} | Hit {hit}")
+
+    return "\n".join(lines)
+
+
 # ==========================================================
 # AI Thesis
 # ==========================================================
@@ -634,6 +856,41 @@ async def cmd_ai(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 
+async def cmd_backtest(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args:
+        await update.message.reply_text("ℹ️ ใช้งาน: /backtest <symbol> เช่น /backtest AAPL")
+        return
+
+    symbol = context.args[0].upper()
+
+    try:
+        # shield: the Future is shared, one handler must not cancel it for others
+        bt = await asyncio.shield(asyncio.wrap_future(submit_backtest(symbol)))
+    except InsufficientHistoryError:
+        await update.message.reply_text(
+            "⏳ ข้อมูลย้อนหลังของหุ้นนี้สั้นเกินไปสำหรับ Backtest\n"
+            f"ต้องมีอย่างน้อย {BACKTEST_MIN_BARS} วันทำการ (~{BACKTEST_MIN_BARS // 252} ปี)"
+        )
+        return
+    except ValueError:
+        await update.message.reply_text(
+            "❌ ไม่พบชื่อหุ้นนี้\nกรุณาตรวจสอบสัญลักษณ์อีกครั้ง"
+        )
+        return
+
+    text = (
+        f"{format_backtest(symbol, bt)}\n\n"
+        "⚠️ ผลในอดีตไม่รับประกันผลในอนาคต"
+    )
+
+    await update.message.reply_text(
+        text,
+        reply_markup=post_result_keyboard()
+    )
+
+
+
+
 # ==========================================================
 # App Bootstrap
 # ==========================================================
@@ -655,6 +912,7 @@ def main():
 
     app.add_handler(CommandHandler("ta", cmd_ta))
     app.add_handler(CommandHandler("ai", cmd_ai))
+    app.add_handler(CommandHandler("backtest", cmd_backtest))
 
     app.run_polling()
 
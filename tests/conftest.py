@@ -0,0 +1,6 @@
+import os
+import sys
+
+# bot.py builds the OpenAI client at import time
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
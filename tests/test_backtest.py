@@ -0,0 +1,185 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import bot
+
+
+def baseline_rules(price, ema50, ema100, ema200, rsi):
+    # the /ta rules before they were shared with the backtest
+    if price > ema50 > ema100 > ema200:
+        trend = "UP"
+    elif price < ema200:
+        trend = "DOWN"
+    else:
+        trend = "SIDE"
+
+    if trend == "UP" and 40 <= rsi <= 60 and price <= ema50:
+        strategy = "BUY"
+    elif trend == "UP" and rsi > 70:
+        strategy = "HOLD"
+    elif trend == "DOWN":
+        strategy = "AVOID"
+    else:
+        strategy = "WAIT"
+
+    return trend, strategy
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    bot._backtest_cache.clear()
+    yield
+    bot._backtest_cache.clear()
+
+
+def fake_ticker(history):
+    class Ticker:
+        def __init__(self, symbol):
+            self.symbol = symbol
+
+        def history(self, period):
+            return history(self.symbol)
+
+    return Ticker
+
+
+def price_frame(n=bot.BACKTEST_MIN_BARS):
+    idx = pd.bdate_range("2015-01-01", periods=n)
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0004, 0.015, n)))
+    return pd.DataFrame({"Close": close}, index=idx)
+
+
+@pytest.mark.parametrize("args", [
+    (110, 100, 95, 90, 75),    # uptrend, overbought
+    (110, 100, 95, 90, 50),    # uptrend, neutral RSI
+    (80, 100, 95, 92, 50),     # EMAs stacked up but price below EMA200
+    (80, 90, 95, 100, 25),     # downtrend
+    (98, 100, 95, 90, 50),     # pullback below EMA50
+    (96, 100, 105, 95, 50),    # sideways
+])
+def test_thesis_rules_match_baseline(args):
+    assert bot.thesis_rules(*args) == baseline_rules(*args)
+
+
+def test_thesis_rules_series_matches_scalars():
+    close = price_frame()["Close"]
+    ema50 = close.ewm(span=50, adjust=False).mean()
+    ema100 = close.ewm(span=100, adjust=False).mean()
+    ema200 = close.ewm(span=200, adjust=False).mean()
+    rsi = bot.calculate_rsi(close)
+
+    _, series = bot.thesis_rules(close, ema50, ema100, ema200, rsi)
+    scalars = [
+        baseline_rules(close.iloc[i], ema50.iloc[i], ema100.iloc[i], ema200.iloc[i], rsi.iloc[i])[1]
+        for i in range(len(close))
+    ]
+
+    assert series.tolist() == scalars
+
+
+def test_position_series_trades_on_next_bar():
+    signals = pd.Series(["WAIT", "BUY", "WAIT", "AVOID", "HOLD"])
+
+    position = bot._position_series(signals)
+
+    assert position.tolist() == [0.0, 0.0, 1.0, 1.0, 0.0]
+
+
+def test_trade_returns_splits_trades():
+    position = pd.Series([0, 1, 1, 0, 1, 0], dtype=float)
+    bar_returns = pd.Series([0.5, 0.1, 0.1, 0.5, -0.2, 0.5])
+
+    trades = bot._trade_returns(position, bar_returns)
+
+    assert trades.tolist() == pytest.approx([1.1 * 1.1 - 1, -0.2])
+
+
+def test_label_stats_excludes_unscored_tail():
+    n = 50
+    signals = pd.Series(["AVOID"] * n)
+    close = pd.Series(np.linspace(100, 150, n))
+
+    stats = bot._label_stats(signals, close)
+
+    assert stats["AVOID"]["bars"] == n - bot.BACKTEST_HORIZON
+    assert stats["AVOID"]["hit_rate"] == 100
+    assert stats["BUY"]["bars"] == 0
+
+
+def test_short_history_raises_insufficient(monkeypatch):
+    frame = price_frame(bot.BACKTEST_MIN_BARS - 1)
+    monkeypatch.setattr(bot.yf, "Ticker", fake_ticker(lambda s: frame))
+
+    with pytest.raises(bot.InsufficientHistoryError):
+        bot.backtest("IPO")
+
+
+def test_submit_backtest_fetches_once(monkeypatch):
+    calls = []
+    frame = price_frame()
+
+    def history(symbol):
+        calls.append(symbol)
+        return frame
+
+    monkeypatch.setattr(bot.yf, "Ticker", fake_ticker(history))
+
+    first = bot.backtest("aapl")
+    second = bot.backtest("AAPL")
+
+    assert first is second
+    assert calls == ["AAPL"]
+
+
+def test_submit_backtest_evicts_failed(monkeypatch):
+    def history(symbol):
+        raise RuntimeError("network")
+
+    monkeypatch.setattr(bot.yf, "Ticker", fake_ticker(history))
+
+    with pytest.raises(RuntimeError):
+        bot.backtest("BAD")
+
+    assert not any(key[0] == "BAD" for key in bot._backtest_cache)
+
+
+def test_submit_backtest_evicts_cancelled(monkeypatch):
+    release = threading.Event()
+    frame = price_frame()
+
+    def history(symbol):
+        release.wait(5)
+        return frame
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(bot, "_backtest_pool", pool)
+    monkeypatch.setattr(bot.yf, "Ticker", fake_ticker(history))
+
+    running = bot.submit_backtest("A")
+    queued = bot.submit_backtest("B")
+    assert queued.cancel()
+    release.set()
+    running.result()
+    pool.shutdown()
+
+    assert not any(key[0] == "B" for key in bot._backtest_cache)
+
+
+def test_backtest_universe_skips_failures(monkeypatch):
+    frame = price_frame()
+
+    def history(symbol):
+        if symbol == "BAD":
+            raise RuntimeError("network")
+        return frame
+
+    monkeypatch.setattr(bot.yf, "Ticker", fake_ticker(history))
+
+    results = bot.backtest_universe(["a", "BAD"])
+
+    assert list(results) == ["A"]